@@ -1,4 +1,5 @@
-//mod graph_layout;
+#[cfg(test)]
+mod graph_layout;
 
 use std::collections::HashMap;
 
@@ -20,7 +21,6 @@ pub fn create_layouts_i32(
     vertex_size: isize,
     global_tasks_in_first_row: bool,
 ) -> (Vec<NodePositions>, Vec<usize>, Vec<usize>) {
-    env_logger::Builder::from_env(Env::default().default_filter_or("trace")).init();
     info!(target: "temanejo", "Got {} vertices and {} edges. Vertex size: {}", nodes.len(), edges.len(), vertex_size);
     debug!(target: "temanejo", "Vertices {:?}\nEdges: {:?}", nodes, edges);
 
@@ -57,6 +57,8 @@ pub fn create_layouts_i32(
 
 #[pymodule]
 fn rs_graph_layout(_py: Python<'_>, m: &PyModule) -> PyResult<()> {
+    // initialize the logger once on import. If another extension already installed a global logger, keep using that one
+    let _ = env_logger::Builder::from_env(Env::default().default_filter_or("trace")).try_init();
     m.add_function(wrap_pyfunction!(create_layouts_i32, m)?)?;
     Ok(())
 }